@@ -33,59 +33,133 @@ with col1:
     st.subheader("Input JSON")
     input_json = st.text_area("Paste your JSON here:", example_input, height=300)
 
+# Whitespace runs containing a line break or tab. These can't occur inside valid JSON
+# strings, so they are collapsed to a single space up front with a plain C-level replace.
+_LINE_BREAK_RE = re.compile(r'[\t\n\r\f\v]\s*', re.ASCII)
+
+# Compiled once per process instead of on every rerun. Each match is a run of text that is
+# copied as-is (`lead`: anything outside strings, whole string literals, colons that don't
+# start a variable and single spaces) followed by the one thing that needs rewriting: an
+# unquoted variable value right after a key, a run of spaces, or the end of the input.
+# String literals are consumed inside the lead, so values inside strings are never treated
+# as variables, and Python is only called back once per variable or run of spaces.
+# Possessive quantifiers keep the scan linear.
+_VALUE = r'(?!(?:true|false|null)\ *[,}\]])[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z0-9_().]+)?(?=\ *[,}\]])'
+_TOKEN_RE = re.compile(rf"""
+    (?P<lead>(?:
+        [^" :]++
+      | "[^"\\]*(?:\\.[^"\\]*)*"?                   # string literal, possibly unterminated
+      | :(?!\ *{_VALUE})
+      | \ (?!\ )
+    )*+)
+    (?:
+        :(?P<gap>\ *)(?P<var>{_VALUE})              # JSON literals are not variables
+      | (?P<space>\ \ +)
+      | \Z
+    )
+""", re.VERBOSE | re.DOTALL | re.ASCII)
+
+# Used to reduce the input to the braces and brackets outside string literals
+_CLOSED_STRING_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_NON_BRACKET_RE = re.compile(r'[^{}\[\]]+')
+_OPENING_BRACKETS = {'}': '{', ']': '['}
+# Innermost pairs are stripped with C-level replaces this many times before falling back
+# to a stack, which keeps deeply nested input linear
+_PAIR_PASSES = 8
+
+def _has_json_structure(input_text):
+    """Check that all strings are closed and braces and brackets outside them nest properly"""
+    skeleton = _CLOSED_STRING_RE.sub('', input_text)
+    if '"' in skeleton:
+        # An unterminated string is left behind
+        return False
+    brackets = _NON_BRACKET_RE.sub('', skeleton)
+    if ('{' not in brackets
+            or brackets.count('{') != brackets.count('}')
+            or brackets.count('[') != brackets.count(']')):
+        return False
+    
+    # Properly nested input reduces to nothing when innermost pairs are removed
+    for _ in range(_PAIR_PASSES):
+        reduced = brackets.replace('{}', '').replace('[]', '')
+        if reduced == brackets:
+            return not reduced
+        brackets = reduced
+    
+    open_brackets = []
+    for bracket in brackets:
+        if bracket == '{' or bracket == '[':
+            open_brackets.append(bracket)
+        elif not open_brackets or open_brackets.pop() != _OPENING_BRACKETS[bracket]:
+            return False
+    return not open_brackets
+
+# Streamlit reruns the whole script on every interaction, so the formatter is memoized
+# on the input text and only does work when the input actually changes
+@st.cache_data(max_entries=64, show_spinner=False)
 def format_for_uipath(input_text):
+    """Return the UIPath form of the input, the variables spliced into it and whether
+    the input has proper JSON structure, with a validation message"""
     try:
-        # Remove extra whitespace and normalize the input
-        normalized_text = re.sub(r'\s+', ' ', input_text.strip())
-        
-        # Find all potential variables (not quoted strings, not numbers, not booleans)
-        # Pattern to match: key: value where value is not quoted, not a number, not boolean
-        variable_pattern = r':\s*([A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z0-9_().]+)*)\s*(?=[,}\]])'
-        
-        # Find all variables
-        variables = re.findall(variable_pattern, normalized_text)
+        variables = []
         
-        # Start processing the text
-        result = normalized_text
+        def rewrite_token(token):
+            kind = token.lastgroup
+            if kind == 'var':
+                # Inject the variable using string concatenation, recording it as we go.
+                # Quotes are doubled afterwards together with the rest of the text
+                variable = token.group('var')
+                variables.append(variable)
+                gap = ' ' if token.group('gap') else ''
+                return f'{token.group("lead")}:{gap}" + {variable} + "'
+            if kind == 'space':
+                # Collapse runs of spaces outside strings into a single space
+                return token.group('lead') + ' '
+            return token.group('lead')
         
-        # Replace each variable with the UIPath format
-        for var in set(variables):  # Use set to avoid duplicates
-            # Create pattern to match the variable in context
-            pattern = f'(:\\s*){re.escape(var)}(\\s*[,}}\\]])'
-            replacement = f'\\1" + {var} + "\\2'
-            result = re.sub(pattern, replacement, result)
-        
-        # Handle edge cases where we might have empty strings
-        result = re.sub(r'"\s*\+\s*"', '', result)  # Remove empty concatenations
-        result = re.sub(r'\+\s*""\s*\+', ' + ', result)  # Clean up empty string concatenations
+        # Plain JSON has no unquoted variables (they always fail a real parse), so a
+        # successful parse means only whitespace and quotes need rewriting
+        try:
+            json.loads(input_text)
+            parsed = True
+        except (json.JSONDecodeError, RecursionError):
+            # Not plain JSON, or too deeply nested for the parser
+            parsed = False
         
-        # Double all remaining quotes for UIPath
-        result = result.replace('"', '""')
+        text = _LINE_BREAK_RE.sub(' ', input_text.strip())
+        if parsed and '  ' not in text:
+            # Nothing left to rewrite, skip the scan
+            body = text
+        else:
+            body = _TOKEN_RE.sub(rewrite_token, text)
         
-        # Wrap the entire string in quotes
-        result = '"' + result + '"'
+        # Double all quotes for UIPath in one C-level pass, then wrap the entire string in
+        # quotes. The f-string does that with one allocation instead of copying twice
+        body = body.replace('"', '""')
+        result = f'"{body}"'
         
-        # Clean up any malformed concatenations
-        result = re.sub(r'""""\s*\+\s*', '"" + ', result)
-        result = re.sub(r'\+\s*""""', ' + ""', result)
+        # The collapsed text has the same quotes and brackets as the input, with less to skip
+        if parsed:
+            is_valid, validation_msg = True, "Valid JSON structure"
+        elif _has_json_structure(text):
+            is_valid, validation_msg = True, "JSON-like structure with variables detected"
+        else:
+            is_valid, validation_msg = False, "Invalid JSON structure"
         
-        return result
+        # De-duplicate, keeping the order in which variables first appear
+        return result, list(dict.fromkeys(variables)), is_valid, validation_msg
         
     except Exception as e:
         raise Exception(f"Error processing JSON: {str(e)}")
 
-def validate_json_structure(input_text):
-    """Validate if the input has proper JSON structure"""
-    try:
-        # Try to parse as JSON first (this will fail if variables are present, but that's ok)
-        json.loads(input_text)
-        return True, "Valid JSON structure"
-    except json.JSONDecodeError:
-        # Check if it looks like JSON with variables
-        if '{' in input_text and '}' in input_text:
-            return True, "JSON-like structure with variables detected"
-        else:
-            return False, "Invalid JSON structure"
+# Analyze the input once per rerun and share the result below. Errors are kept for the
+# result column instead of stopping the script, so the rest of the page still renders
+format_error = None
+try:
+    formatted_result, variables, is_valid, validation_msg = format_for_uipath(input_json)
+except Exception as e:
+    format_error = str(e)
+    formatted_result, variables, is_valid, validation_msg = "", [], False, format_error
 
 # Process button
 process_button = st.button("Format JSON")
@@ -94,35 +168,31 @@ with col2:
     st.subheader("Formatted Result (UIPath Compatible)")
     
     if process_button:
-        try:
-            # Validate input structure
-            is_valid, validation_msg = validate_json_structure(input_json)
+        if format_error:
+            st.error(f"Error formatting JSON: {format_error}")
+            st.error("Please check your input JSON syntax and try again.")
+        elif not is_valid:
+            st.error(f"Input validation failed: {validation_msg}")
+            st.error("Please check your JSON structure and try again.")
+        else:
+            # Read-only output: st.code carries no widget state and has a built-in copy button
+            st.caption("Copy this to UIPath:")
+            st.code(formatted_result, language="json", wrap_lines=True)
+            # Downloading must not rerun the script, or the result would be replaced by the example
+            st.download_button("Download", formatted_result, file_name="body.txt", on_click="ignore")
             
-            if not is_valid:
-                st.error(f"Input validation failed: {validation_msg}")
-                st.error("Please check your JSON structure and try again.")
-            else:
-                # Format the input JSON
-                formatted_result = format_for_uipath(input_json)
-                st.text_area("Copy this to UIPath:", formatted_result, height=300)
-                
-                st.success("JSON formatted successfully!")
-                
-                # Show usage instructions
-                st.info("In UIPath, paste this result directly in the 'Body' property of an HTTP Request activity.")
-                
-                # Show detected variables
-                variable_pattern = r':\s*([A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z0-9_().]+)*)\s*(?=[,}\]])'
-                variables = re.findall(variable_pattern, input_json)
-                if variables:
-                    st.info(f"Detected variables: {', '.join(set(variables))}")
+            st.success("JSON formatted successfully!")
             
-        except Exception as e:
-            st.error(f"Error formatting JSON: {str(e)}")
-            st.error("Please check your input JSON syntax and try again.")
+            # Show usage instructions
+            st.info("In UIPath, paste this result directly in the 'Body' property of an HTTP Request activity.")
+            
+            # Show detected variables
+            if variables:
+                st.info(f"Detected variables: {', '.join(variables)}")
     else:
         # Show example output
-        st.text_area("Example output:", example_output, height=300)
+        st.caption("Example output:")
+        st.code(example_output, language="json", wrap_lines=True)
 
 # Explanation section
 st.markdown("""
@@ -140,6 +210,7 @@ When using HTTP Request activities in UIPath, JSON data needs special formatting
 - Can contain letters, numbers, underscores
 - Can include property access with dots (e.g., `User.Name`, `Count.ToString()`)
 - Must not be enclosed in quotes in the original JSON
+- JSON literals (`true`, `false`, `null`) are left as they are
 
 ### Example Transformations:
 
@@ -185,9 +256,5 @@ with st.expander("Testing Your Variables"):
 with st.expander("Debug Information"):
     if input_json.strip():
         st.write("**Input Analysis:**")
-        variable_pattern = r':\s*([A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z0-9_().]+)*)\s*(?=[,}\]])'
-        variables = re.findall(variable_pattern, input_json)
-        st.write(f"Detected variables: {list(set(variables))}")
-        
-        is_valid, validation_msg = validate_json_structure(input_json)
+        st.write(f"Detected variables: {variables}")
         st.write(f"Structure validation: {validation_msg}")
\ No newline at end of file